@@ -15,14 +15,16 @@ Usage:
 
 import os
 import sys
-import uuid
 import logging
+import secrets
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
 
 # Add the parent directory to the path so we can import the travel_orm package
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from travel_orm.connection import test_connection, DatabaseConnection
+from travel_orm import connection
+from travel_orm.connection import DatabaseConnection
 from travel_orm.models import (
     TravelAdvisor, Itinerary, Day, ItineraryItem, 
     DataSource, InformationDocument
@@ -35,13 +37,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Set AWS region if not already set
-if 'AWS_REGION' not in os.environ:
-    os.environ['AWS_REGION'] = 'us-west-1'
+# Keep SQLAlchemy from logging every statement the live run issues
+logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
 
-# Set DB_SECRET_NAME if not already set
-if 'DB_SECRET_NAME' not in os.environ:
-    os.environ['DB_SECRET_NAME'] = 'travel-itinerary-db-credentials'
+# Default the AWS region and secret name unless already set
+for key, value in {
+    'AWS_REGION': 'us-west-1',
+    'DB_SECRET_NAME': 'travel-itinerary-db-credentials',
+}.items():
+    os.environ.setdefault(key, value)
 
 
 class LiveDatabaseTest:
@@ -49,7 +53,7 @@ class LiveDatabaseTest:
     
     def __init__(self):
         """Initialize test class"""
-        self.test_id = str(uuid.uuid4())[:8]  # Use a unique ID for this test run
+        self.test_id = secrets.token_hex(4)  # Use a unique ID for this test run
         self.created_objects = {
             'advisor': None,
             'data_source': None,
@@ -58,32 +62,41 @@ class LiveDatabaseTest:
             'items': [],
             'documents': []
         }
-        logger.info(f"Initialized test run with ID: {self.test_id}")
+        logger.info("Initialized test run with ID: %s", self.test_id)
     
     def run_tests(self):
         """Run all tests"""
         try:
             self.test_connection()
-            self.test_create_advisor()
-            self.test_create_data_source()
+            
+            # Steps grouped together only depend on earlier steps, so their
+            # database round trips can overlap on separate pooled connections
+            self.run_concurrently(self.test_create_advisor, self.test_create_data_source)
             self.test_create_itinerary()
-            self.test_create_days()
-            self.test_create_items()
-            self.test_create_document()
+            self.run_concurrently(self.test_create_days_and_items, self.test_create_document)
+            
             self.test_query_operations()
             self.test_update_operations()
             logger.info("All tests completed successfully!")
             return True
         except Exception as e:
-            logger.error(f"Test failed: {str(e)}")
+            logger.error("Test failed: %s", e)
             return False
         finally:
             self.cleanup()
     
+    def run_concurrently(self, *steps):
+        """Run independent test steps in parallel threads, re-raising the first failure"""
+        # Each thread gets its own scoped session and pooled connection
+        with ThreadPoolExecutor(max_workers=len(steps)) as executor:
+            futures = [executor.submit(step) for step in steps]
+            for future in futures:
+                future.result()
+    
     def test_connection(self):
         """Test database connection"""
         logger.info("Testing database connection...")
-        result = test_connection()
+        result = connection.test_connection()
         logger.info(result)
         if "Successfully connected" not in result:
             raise Exception("Failed to connect to database")
@@ -97,16 +110,12 @@ class LiveDatabaseTest:
             website="https://example.com",
             company_name=f"Test Company {self.test_id}"
         )
-        logger.info(f"Created advisor: {advisor}")
-        self.created_objects['advisor'] = advisor
+        logger.info("Created advisor: %s", advisor)
         
-        # Verify by retrieving
-        retrieved = TravelAdvisor.get_by_id(advisor.id)
-        if not retrieved or retrieved.name != advisor.name:
-            raise Exception("Failed to retrieve created advisor")
-        
-        # Store the retrieved object for future use
-        self.created_objects['advisor'] = retrieved
+        # create() flushes and refreshes the row, so a set id confirms the insert
+        if not advisor.id:
+            raise Exception("Failed to create advisor")
+        self.created_objects['advisor'] = advisor
         logger.info("Travel advisor creation test passed")
     
     def test_create_data_source(self):
@@ -116,16 +125,11 @@ class LiveDatabaseTest:
             type="email",
             url=f"s3://test-bucket/test-{self.test_id}.eml"
         )
-        logger.info(f"Created data source: {data_source}")
-        self.created_objects['data_source'] = data_source
+        logger.info("Created data source: %s", data_source)
         
-        # Verify by retrieving
-        retrieved = DataSource.get_by_id(data_source.id)
-        if not retrieved or retrieved.url != data_source.url:
-            raise Exception("Failed to retrieve created data source")
-            
-        # Store the retrieved object for future use
-        self.created_objects['data_source'] = retrieved
+        if not data_source.id:
+            raise Exception("Failed to create data source")
+        self.created_objects['data_source'] = data_source
         logger.info("Data source creation test passed")
     
     def test_create_itinerary(self):
@@ -138,16 +142,11 @@ class LiveDatabaseTest:
             duration=7,
             destination=f"Test Destination {self.test_id}"
         )
-        logger.info(f"Created itinerary: {itinerary}")
-        self.created_objects['itinerary'] = itinerary
+        logger.info("Created itinerary: %s", itinerary)
         
-        # Verify by retrieving
-        retrieved = Itinerary.get_by_id(itinerary.id)
-        if not retrieved or retrieved.destination != itinerary.destination:
-            raise Exception("Failed to retrieve created itinerary")
-            
-        # Store the retrieved object for future use
-        self.created_objects['itinerary'] = retrieved
+        if not itinerary.id:
+            raise Exception("Failed to create itinerary")
+        self.created_objects['itinerary'] = itinerary
         logger.info("Itinerary creation test passed")
     
     def test_create_days(self):
@@ -155,21 +154,20 @@ class LiveDatabaseTest:
         logger.info("Testing day creation...")
         itinerary = self.created_objects['itinerary']
         
-        for i in range(1, 4):  # Create 3 days
-            day = Day.create(
-                itinerary_id=itinerary.id,
-                index=i,
-                title=f"Day {i} - Test {self.test_id}"
-            )
-            logger.info(f"Created day: {day}")
-            
-            # Verify by retrieving and store the retrieved object
-            retrieved = Day.get_by_id(day.id)
-            if not retrieved:
-                raise Exception(f"Failed to retrieve created day {i}")
-            self.created_objects['days'].append(retrieved)
+        # Create 3 days in one transaction
+        days = Day.create_many([
+            {
+                'itinerary_id': itinerary.id,
+                'index': i,
+                'title': f"Day {i} - Test {self.test_id}"
+            }
+            for i in range(1, 4)
+        ])
+        for day in days:
+            logger.info("Created day: %s", day)
+        self.created_objects['days'].extend(days)
         
-        # Verify all days were created
+        # Verify all days were created with a single query
         def query_func(session):
             return session.query(Day).filter_by(itinerary_id=itinerary.id).order_by(Day.index).all()
         
@@ -182,30 +180,29 @@ class LiveDatabaseTest:
         """Test creating itinerary items"""
         logger.info("Testing itinerary item creation...")
         
-        # Create items for each day
+        # Create a hotel and an activity item for each day in one transaction
+        rows = []
         for day in self.created_objects['days']:
-            # Create a hotel item
-            hotel = ItineraryItem.create(
-                day_id=day.id,
-                index=1,
-                title=f"Hotel {day.index} - Test {self.test_id}",
-                type="hotel",
-                detail_text="Test hotel details",
-                data_source_id=self.created_objects['data_source'].id
-            )
-            logger.info(f"Created hotel item: {hotel}")
-            self.created_objects['items'].append(hotel)
-            
-            # Create an activity item
-            activity = ItineraryItem.create(
-                day_id=day.id,
-                index=2,
-                title=f"Activity {day.index} - Test {self.test_id}",
-                type="activity",
-                detail_text="Test activity details"
-            )
-            logger.info(f"Created activity item: {activity}")
-            self.created_objects['items'].append(activity)
+            rows.append({
+                'day_id': day.id,
+                'index': 1,
+                'title': f"Hotel {day.index} - Test {self.test_id}",
+                'type': "hotel",
+                'detail_text': "Test hotel details",
+                'data_source_id': self.created_objects['data_source'].id
+            })
+            rows.append({
+                'day_id': day.id,
+                'index': 2,
+                'title': f"Activity {day.index} - Test {self.test_id}",
+                'type': "activity",
+                'detail_text': "Test activity details"
+            })
+        
+        items = ItineraryItem.create_many(rows)
+        for item in items:
+            logger.info("Created %s item: %s", item.type, item)
+        self.created_objects['items'].extend(items)
         
         # Verify by retrieving
         def query_func(session):
@@ -218,6 +215,11 @@ class LiveDatabaseTest:
             raise Exception(f"Expected 6 items, got {len(items)}")
         logger.info("Itinerary item creation test passed")
     
+    def test_create_days_and_items(self):
+        """Test creating days and then their itinerary items"""
+        self.test_create_days()
+        self.test_create_items()
+    
     def test_create_document(self):
         """Test creating an information document"""
         logger.info("Testing information document creation...")
@@ -229,13 +231,11 @@ class LiveDatabaseTest:
             text="This is a test document.",
             formatted_text="<p>This is a test document.</p>"
         )
-        logger.info(f"Created document: {document}")
-        self.created_objects['documents'].append(document)
+        logger.info("Created document: %s", document)
         
-        # Verify by retrieving
-        retrieved = InformationDocument.get_by_id(document.id)
-        if not retrieved or retrieved.title != document.title:
-            raise Exception("Failed to retrieve created document")
+        if not document.id:
+            raise Exception("Failed to create document")
+        self.created_objects['documents'].append(document)
         logger.info("Information document creation test passed")
     
     def test_query_operations(self):
@@ -251,7 +251,7 @@ class LiveDatabaseTest:
         itineraries = Itinerary.execute_query(query_itineraries_by_advisor)
         if len(itineraries) < 1:
             raise Exception("Failed to query itineraries by advisor")
-        logger.info(f"Found {len(itineraries)} itineraries for advisor")
+        logger.info("Found %s itineraries for advisor", len(itineraries))
         
         # Test querying items by type
         def query_items_by_type(session):
@@ -260,7 +260,7 @@ class LiveDatabaseTest:
         hotels = ItineraryItem.execute_query(query_items_by_type)
         if len(hotels) < 3:  # We created 3 hotels (1 per day)
             raise Exception("Failed to query items by type")
-        logger.info(f"Found {len(hotels)} hotel items")
+        logger.info("Found %s hotel items", len(hotels))
         
         # Test a more complex join query
         def query_items_with_day_and_itinerary(session):
@@ -288,9 +288,8 @@ class LiveDatabaseTest:
             duration=10
         )
         
-        # Verify update
-        retrieved = Itinerary.get_by_id(itinerary.id)
-        if retrieved.destination != f"Updated Destination {self.test_id}" or retrieved.duration != 10:
+        # update() returns the row as written by UPDATE ... RETURNING
+        if updated_itinerary.destination != f"Updated Destination {self.test_id}" or updated_itinerary.duration != 10:
             raise Exception("Failed to update itinerary")
         logger.info("Itinerary update test passed")
         
@@ -312,31 +311,26 @@ class LiveDatabaseTest:
         logger.info("Cleaning up test data...")
         
         try:
-            # Delete in reverse order of creation to respect foreign key constraints
-            for document in self.created_objects['documents']:
-                if document and hasattr(document, 'id'):
-                    document.delete()
-            
-            for item in self.created_objects['items']:
-                if item and hasattr(item, 'id'):
-                    item.delete()
-            
-            for day in self.created_objects['days']:
-                if day and hasattr(day, 'id'):
-                    day.delete()
-            
-            if self.created_objects['itinerary'] and hasattr(self.created_objects['itinerary'], 'id'):
-                self.created_objects['itinerary'].delete()
-            
-            if self.created_objects['data_source'] and hasattr(self.created_objects['data_source'], 'id'):
-                self.created_objects['data_source'].delete()
-            
-            if self.created_objects['advisor'] and hasattr(self.created_objects['advisor'], 'id'):
-                self.created_objects['advisor'].delete()
+            # Run every delete in one transaction; each Model call joins this scope
+            with DatabaseConnection.session_scope():
+                # Delete in reverse order of creation to respect foreign key constraints,
+                # one statement per table for the multi-row collections
+                InformationDocument.delete_many([document.id for document in self.created_objects['documents']])
+                ItineraryItem.delete_many([item.id for item in self.created_objects['items']])
+                Day.delete_many([day.id for day in self.created_objects['days']])
+                
+                if self.created_objects['itinerary'] and hasattr(self.created_objects['itinerary'], 'id'):
+                    self.created_objects['itinerary'].delete()
+                
+                if self.created_objects['data_source'] and hasattr(self.created_objects['data_source'], 'id'):
+                    self.created_objects['data_source'].delete()
+                
+                if self.created_objects['advisor'] and hasattr(self.created_objects['advisor'], 'id'):
+                    self.created_objects['advisor'].delete()
             
             logger.info("Cleanup completed successfully")
         except Exception as e:
-            logger.error(f"Error during cleanup: {str(e)}")
+            logger.error("Error during cleanup: %s", e)
 
 
 if __name__ == "__main__":
@@ -2,17 +2,31 @@
 Tests for the database models
 """
 
+import json
+import os
+import tempfile
 import unittest
-from unittest.mock import patch, MagicMock
-from datetime import date, datetime
+from unittest.mock import patch
+from datetime import date, datetime, timezone
 import uuid
 
+from sqlalchemy import ARRAY, create_engine, event
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from travel_orm.connection import DatabaseConnection
 from travel_orm.models import (
     TravelAdvisor, Itinerary, Day, ItineraryItem, 
-    DataSource, InformationDocument, Model
+    DataSource, InformationDocument, Model, Base
 )
 
 
+@compiles(ARRAY, 'sqlite')
+def compile_array_sqlite(type_, compiler, **kw):
+    """Store PostgreSQL ARRAY columns as JSON so every table exists on SQLite"""
+    return 'JSON'
+
+
 class TestModels(unittest.TestCase):
     """Test cases for model classes"""
     
@@ -68,82 +82,179 @@ class TestModels(unittest.TestCase):
             index=1,
             title="Test Document"
         )
+        
+        # Back DatabaseConnection with a temporary SQLite database. A file rather
+        # than :memory: gives each session its own connection, as on PostgreSQL.
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmpdir.name, 'test.db')}")
+        
+        # Let SQLAlchemy emit BEGIN itself; pysqlite otherwise defers it and
+        # SAVEPOINTs would commit on release instead of nesting like PostgreSQL.
+        # WAL lets a reading session stay open while another one commits, and
+        # foreign keys are enforced as on PostgreSQL.
+        @event.listens_for(self.engine, 'connect')
+        def disable_pysqlite_begin(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+            dbapi_connection.execute('PRAGMA journal_mode=WAL')
+            dbapi_connection.execute('PRAGMA foreign_keys=ON')
+        
+        @event.listens_for(self.engine, 'begin')
+        def emit_begin(conn):
+            conn.exec_driver_sql('BEGIN')
+        
+        Base.metadata.create_all(self.engine)
+        DatabaseConnection._engine = self.engine
+        DatabaseConnection._session_factory = scoped_session(sessionmaker(bind=self.engine, expire_on_commit=False))
+    
+    def tearDown(self):
+        """Tear down the temporary database"""
+        DatabaseConnection._session_factory.remove()
+        DatabaseConnection._engine = None
+        DatabaseConnection._session_factory = None
+        self.engine.dispose()
+        self.tmpdir.cleanup()
+    
+    def _seed(self, *instances):
+        """Insert copies of the given instances, leaving the originals untouched"""
+        with DatabaseConnection.session_scope() as session:
+            for instance in instances:
+                session.merge(instance)
     
-    @patch('travel_orm.models.DatabaseConnection.session_scope')
-    def test_create(self, mock_session_scope):
+    def test_create(self):
         """Test creating a model instance"""
-        # Setup mock
-        mock_session = MagicMock()
-        mock_context = MagicMock()
-        mock_context.__enter__.return_value = mock_session
-        mock_session_scope.return_value = mock_context
-        
         # Test creating a travel advisor
-        TravelAdvisor.create(
+        advisor = TravelAdvisor.create(
             name="New Advisor",
             phone_number="555-987-6543",
             company_name="New Company"
         )
         
         # Verify
-        mock_session.add.assert_called_once()
-        mock_session.flush.assert_called_once()
-        mock_session.refresh.assert_called_once()
+        self.assertIsNotNone(advisor.id)
+        self.assertIsNotNone(advisor.created_at)
+        stored = TravelAdvisor.get_by_id(advisor.id)
+        self.assertEqual(stored.name, "New Advisor")
+        self.assertEqual(stored.phone_number, "555-987-6543")
+        self.assertEqual(stored.company_name, "New Company")
+        
+        # Test that the created instance matches the stored row, including
+        # caller values the database coerces
+        self._seed(self.advisor)
+        itinerary = Itinerary.create(
+            travel_advisor_id=self.advisor_id,
+            start_date=date(2025, 7, 1),
+            duration="7",
+            destination="Coerced Destination"
+        )
+        self.assertEqual(itinerary.to_dict(), Itinerary.get_by_id(itinerary.id).to_dict())
+    
+    def test_create_many(self):
+        """Test creating several model instances at once"""
+        self._seed(self.advisor, self.itinerary)
+        
+        # Test creating days in one call
+        days = Day.create_many([
+            {'itinerary_id': self.itinerary_id, 'index': 1, 'title': "Day 1"},
+            {'itinerary_id': self.itinerary_id, 'index': 2, 'title': "Day 2"}
+        ])
+        
+        # Verify
+        self.assertEqual([day.title for day in days], ["Day 1", "Day 2"])
+        self.assertTrue(all(day.id for day in days))
+        stored = Day.execute_query(
+            lambda session: session.query(Day).filter_by(itinerary_id=self.itinerary_id).order_by(Day.index).all()
+        )
+        self.assertEqual([day.id for day in stored], [day.id for day in days])
+    
+    def test_bulk_create(self):
+        """Test inserting several records without model instances"""
+        self._seed(self.advisor, self.itinerary)
+        
+        # Test inserting days in one statement
+        ids = Day.bulk_create([
+            {'itinerary_id': self.itinerary_id, 'index': 1, 'title': "Day 1"},
+            {'itinerary_id': self.itinerary_id, 'index': 2, 'title': "Day 2"}
+        ])
+        
+        # Verify
+        self.assertEqual(len(ids), 2)
+        self.assertEqual([Day.get_by_id(id).title for id in ids], ["Day 1", "Day 2"])
+        self.assertIsNotNone(Day.get_by_id(ids[0]).created_at)
+        self.assertEqual(Day.bulk_create([]), [])
     
-    @patch('travel_orm.models.DatabaseConnection.session_scope')
-    def test_get_by_id(self, mock_session_scope):
+    def test_get_by_id(self):
         """Test getting a model by ID"""
-        # Setup mock
-        mock_session = MagicMock()
-        mock_query = MagicMock()
-        mock_session.query.return_value = mock_query
-        mock_context = MagicMock()
-        mock_context.__enter__.return_value = mock_session
-        mock_session_scope.return_value = mock_context
+        self._seed(self.advisor)
         
         # Test getting a travel advisor by ID
-        TravelAdvisor.get_by_id(self.advisor_id)
+        advisor = TravelAdvisor.get_by_id(self.advisor_id)
         
         # Verify
-        mock_session.query.assert_called_once_with(TravelAdvisor)
-        mock_query.get.assert_called_once_with(self.advisor_id)
+        self.assertEqual(advisor.id, self.advisor_id)
+        self.assertEqual(advisor.name, "Test Advisor")
+        self.assertEqual(advisor.company_name, "Test Company")
+        
+        # Test getting a missing travel advisor
+        self.assertIsNone(TravelAdvisor.get_by_id(uuid.uuid4()))
     
-    @patch('travel_orm.models.DatabaseConnection.session_scope')
-    def test_list_all(self, mock_session_scope):
+    def test_list_all(self):
         """Test listing all model instances"""
-        # Setup mock
-        mock_session = MagicMock()
-        mock_query = MagicMock()
-        mock_session.query.return_value = mock_query
-        mock_context = MagicMock()
-        mock_context.__enter__.return_value = mock_session
-        mock_session_scope.return_value = mock_context
+        self._seed(self.advisor, TravelAdvisor(id=uuid.uuid4(), name="Second Advisor"))
         
         # Test listing all travel advisors
-        TravelAdvisor.list_all()
+        advisors = TravelAdvisor.list_all()
         
         # Verify
-        mock_session.query.assert_called_once_with(TravelAdvisor)
-        mock_query.all.assert_called_once()
+        self.assertEqual({advisor.name for advisor in advisors}, {"Test Advisor", "Second Advisor"})
         
         # Test with limit
-        mock_session.reset_mock()
-        mock_query.reset_mock()
-        TravelAdvisor.list_all(limit=10)
+        self.assertEqual(len(TravelAdvisor.list_all(limit=1)), 1)
+    
+    def test_list_rows(self):
+        """Test listing records as read-only rows"""
+        self._seed(self.advisor, TravelAdvisor(id=uuid.uuid4(), name="Second Advisor"))
+        
+        # Test listing travel advisor rows
+        rows = TravelAdvisor.list_rows()
         
         # Verify
-        mock_session.query.assert_called_once_with(TravelAdvisor)
-        mock_query.limit.assert_called_once_with(10)
-        mock_query.limit.return_value.all.assert_called_once()
+        self.assertEqual({row.name for row in rows}, {"Test Advisor", "Second Advisor"})
+        self.assertIn(self.advisor_id, {row.id for row in rows})
+        
+        # Test with limit
+        self.assertEqual(len(TravelAdvisor.list_rows(limit=1)), 1)
     
-    @patch('travel_orm.models.DatabaseConnection.session_scope')
-    def test_update(self, mock_session_scope):
+    def test_stream_all(self):
+        """Test iterating over all records in batches"""
+        self._seed(self.advisor, TravelAdvisor(id=uuid.uuid4(), name="Second Advisor"))
+        
+        # Test streaming with a batch smaller than the table
+        advisors = list(TravelAdvisor.stream_all(chunk=1))
+        
+        # Verify
+        self.assertEqual({advisor.name for advisor in advisors}, {"Test Advisor", "Second Advisor"})
+        
+        # Test that writes made while iterating commit even when the loop stops early
+        for advisor in TravelAdvisor.stream_all(chunk=1):
+            TravelAdvisor.create(name="Streamed Advisor")
+            break
+        
+        # Verify
+        self.assertEqual(len(TravelAdvisor.list_all()), 3)
+    
+    def test_list_all_eager(self):
+        """Test listing records with their relationships loaded"""
+        self._seed(self.advisor, self.itinerary)
+        
+        # Test listing travel advisors with their itineraries
+        advisors = TravelAdvisor.list_all(eager=True)
+        
+        # Verify the detached instances carry their related records
+        self.assertEqual([itinerary.id for itinerary in advisors[0].itineraries], [self.itinerary_id])
+    
+    def test_update(self):
         """Test updating a model instance"""
-        # Setup mock
-        mock_session = MagicMock()
-        mock_context = MagicMock()
-        mock_context.__enter__.return_value = mock_session
-        mock_session_scope.return_value = mock_context
+        self._seed(self.advisor)
         
         # Test updating a travel advisor
         self.advisor.update(
@@ -154,78 +265,197 @@ class TestModels(unittest.TestCase):
         # Verify
         self.assertEqual(self.advisor.name, "Updated Name")
         self.assertEqual(self.advisor.phone_number, "555-111-2222")
-        mock_session.add.assert_called_once_with(self.advisor)
-        mock_session.flush.assert_called_once()
-        mock_session.refresh.assert_called_once()
+        self.assertIsNotNone(self.advisor.updated_at)
+        stored = TravelAdvisor.get_by_id(self.advisor_id)
+        self.assertEqual(stored.name, "Updated Name")
+        self.assertEqual(stored.phone_number, "555-111-2222")
+        self.assertEqual(stored.company_name, "Test Company")
+        
+        # Test updating a missing travel advisor
+        with self.assertRaises(ValueError):
+            TravelAdvisor(id=uuid.uuid4()).update(name="Nobody")
     
-    @patch('travel_orm.models.DatabaseConnection.session_scope')
-    def test_delete(self, mock_session_scope):
+    def test_update_in_scope(self):
+        """Test editing a loaded instance inside a session scope"""
+        self._seed(self.advisor)
+        
+        # Test changing an attribute and letting the scope flush it
+        with DatabaseConnection.session_scope() as session:
+            advisor = session.get(TravelAdvisor, self.advisor_id)
+            advisor.name = "Renamed Advisor"
+        
+        # Verify the onupdate timestamp was loaded before the session closed
+        self.assertIsNotNone(advisor.updated_at)
+        self.assertEqual(advisor.to_dict()['name'], "Renamed Advisor")
+    
+    def test_delete(self):
         """Test deleting a model instance"""
-        # Setup mock
-        mock_session = MagicMock()
-        mock_context = MagicMock()
-        mock_context.__enter__.return_value = mock_session
-        mock_session_scope.return_value = mock_context
+        self._seed(self.advisor)
         
         # Test deleting a travel advisor
         result = self.advisor.delete()
         
         # Verify
         self.assertTrue(result)
-        mock_session.delete.assert_called_once_with(self.advisor)
+        self.assertIsNone(TravelAdvisor.get_by_id(self.advisor_id))
+        
+        # Test deleting an already deleted travel advisor
+        self.assertFalse(self.advisor.delete())
     
-    @patch('travel_orm.models.DatabaseConnection.session_scope')
-    def test_execute_query(self, mock_session_scope):
+    def test_delete_referenced(self):
+        """Test deleting a record that other records reference"""
+        self.item.data_source_id = self.data_source_id
+        self.doc.data_source_id = self.data_source_id
+        self._seed(self.advisor, self.itinerary, self.day, self.data_source, self.item, self.doc)
+        
+        # Test deleting a data source still referenced by an item and a document
+        self.assertTrue(self.data_source.delete())
+        
+        # Verify the references were cleared
+        self.assertIsNone(DataSource.get_by_id(self.data_source_id))
+        self.assertIsNone(ItineraryItem.get_by_id(self.item_id).data_source_id)
+        self.assertIsNone(InformationDocument.get_by_id(self.doc_id).data_source_id)
+        
+        # Test deleting a record nothing references, which takes a single statement
+        self.assertTrue(self.item.delete())
+        self.assertIsNone(ItineraryItem.get_by_id(self.item_id))
+        self.assertFalse(self.item.delete())
+    
+    def test_delete_many(self):
+        """Test deleting several model instances at once"""
+        second_id = uuid.uuid4()
+        self._seed(
+            self.advisor,
+            TravelAdvisor(id=second_id, name="Second Advisor"),
+            TravelAdvisor(id=uuid.uuid4(), name="Kept Advisor")
+        )
+        
+        # Test deleting two existing advisors and one missing id
+        deleted = TravelAdvisor.delete_many([self.advisor_id, second_id, uuid.uuid4()])
+        
+        # Verify
+        self.assertEqual(deleted, 2)
+        self.assertEqual([advisor.name for advisor in TravelAdvisor.list_all()], ["Kept Advisor"])
+        
+        # Test with no ids
+        self.assertEqual(TravelAdvisor.delete_many([]), 0)
+    
+    def test_nested_scope(self):
+        """Test model operations sharing an outer session scope"""
+        # Test that operations in an outer scope commit together
+        with DatabaseConnection.session_scope():
+            advisor = TravelAdvisor.create(name="Outer Advisor")
+            TravelAdvisor.create(name="Second Advisor")
+        
+        # Verify
+        self.assertEqual(TravelAdvisor.get_by_id(advisor.id).name, "Outer Advisor")
+        self.assertEqual(len(TravelAdvisor.list_all()), 2)
+        
+        # Test that a failing outer scope rolls back the nested work
+        with self.assertRaises(ValueError):
+            with DatabaseConnection.session_scope():
+                TravelAdvisor.create(name="Rolled Back Advisor")
+                raise ValueError("Test exception")
+        
+        # Verify
+        self.assertEqual(len(TravelAdvisor.list_all()), 2)
+    
+    def test_nested_scope_keeps_outer_instances(self):
+        """Test that reads in a nested scope leave the outer scope's instances attached"""
+        self._seed(self.advisor)
+        
+        # Test reading an instance the outer scope already loaded, then changing it
+        with DatabaseConnection.session_scope() as session:
+            advisor = session.get(TravelAdvisor, self.advisor_id)
+            self.assertIs(TravelAdvisor.get_by_id(self.advisor_id), advisor)
+            self.assertEqual(TravelAdvisor.list_all(), [advisor])
+            TravelAdvisor.execute_query(lambda nested: nested.query(TravelAdvisor).all())
+            advisor.name = "Renamed Advisor"
+            self.assertIn(advisor, session)
+        
+        # Verify
+        self.assertEqual(TravelAdvisor.get_by_id(self.advisor_id).name, "Renamed Advisor")
+    
+    def test_execute_query(self):
         """Test executing a custom query"""
-        # Setup mock
-        mock_session = MagicMock()
-        mock_context = MagicMock()
-        mock_context.__enter__.return_value = mock_session
-        mock_session_scope.return_value = mock_context
+        self._seed(self.advisor, TravelAdvisor(id=uuid.uuid4(), name="Second Advisor"))
         
         # Define a query function
         def query_func(session):
-            return session.query(TravelAdvisor).filter_by(name="Test").all()
+            return session.query(TravelAdvisor).filter_by(name="Test Advisor").all()
         
         # Test executing the query
-        TravelAdvisor.execute_query(query_func)
+        advisors = TravelAdvisor.execute_query(query_func)
         
         # Verify
-        mock_session.query.assert_called_once_with(TravelAdvisor)
-        mock_session.query.return_value.filter_by.assert_called_once_with(name="Test")
-        mock_session.query.return_value.filter_by.return_value.all.assert_called_once()
+        self.assertEqual(len(advisors), 1)
+        self.assertEqual(advisors[0].id, self.advisor_id)
+        
+        # Test a query that returns a plain value
+        self.assertEqual(TravelAdvisor.execute_query(lambda session: session.query(TravelAdvisor).count()), 2)
     
     def test_to_dict(self):
         """Test converting models to dictionaries"""
-        # Test TravelAdvisor to_dict
-        advisor_dict = self.advisor.to_dict()
-        self.assertEqual(advisor_dict['id'], str(self.advisor_id))
-        self.assertEqual(advisor_dict['name'], "Test Advisor")
-        self.assertEqual(advisor_dict['phone_number'], "555-123-4567")
-        self.assertEqual(advisor_dict['company_name'], "Test Company")
-        
-        # Test Itinerary to_dict
-        itinerary_dict = self.itinerary.to_dict()
-        self.assertEqual(itinerary_dict['id'], str(self.itinerary_id))
-        self.assertEqual(itinerary_dict['travel_advisor_id'], str(self.advisor_id))
-        self.assertEqual(itinerary_dict['start_date'], "2025-07-01")
-        self.assertEqual(itinerary_dict['duration'], 7)
-        self.assertEqual(itinerary_dict['destination'], "Test Destination")
-        
-        # Test Day to_dict
-        day_dict = self.day.to_dict()
-        self.assertEqual(day_dict['id'], str(self.day_id))
-        self.assertEqual(day_dict['itinerary_id'], str(self.itinerary_id))
-        self.assertEqual(day_dict['index'], 1)
-        self.assertEqual(day_dict['title'], "Day 1")
-        
-        # Test ItineraryItem to_dict
-        item_dict = self.item.to_dict()
-        self.assertEqual(item_dict['id'], str(self.item_id))
-        self.assertEqual(item_dict['day_id'], str(self.day_id))
-        self.assertEqual(item_dict['index'], 1)
-        self.assertEqual(item_dict['title'], "Test Item")
-        self.assertEqual(item_dict['type'], "hotel")
+        # Each case pairs a model instance with the to_dict entries it must produce
+        cases = [
+            (self.advisor, {
+                'id': str(self.advisor_id),
+                'name': "Test Advisor",
+                'phone_number': "555-123-4567",
+                'company_name': "Test Company",
+            }),
+            (self.itinerary, {
+                'id': str(self.itinerary_id),
+                'travel_advisor_id': str(self.advisor_id),
+                'start_date': "2025-07-01",
+                'duration': 7,
+                'destination': "Test Destination",
+            }),
+            (self.day, {
+                'id': str(self.day_id),
+                'itinerary_id': str(self.itinerary_id),
+                'index': 1,
+                'title': "Day 1",
+            }),
+            (self.item, {
+                'id': str(self.item_id),
+                'day_id': str(self.day_id),
+                'index': 1,
+                'title': "Test Item",
+                'type': "hotel",
+            }),
+            (self.data_source, {
+                'id': str(self.data_source_id),
+                'type': "email",
+                'url': "s3://bucket/key",
+            }),
+            (self.doc, {
+                'id': str(self.doc_id),
+                'itinerary_id': str(self.itinerary_id),
+                'data_source_id': None,
+                'index': 1,
+                'title': "Test Document",
+            }),
+        ]
+        
+        for instance, expected in cases:
+            with self.subTest(model=type(instance).__name__):
+                instance_dict = instance.to_dict()
+                self.assertEqual({key: instance_dict[key] for key in expected}, expected)
+    
+    def test_to_json(self):
+        """Test converting models to JSON"""
+        # Test with whichever JSON backend is installed
+        self.assertEqual(json.loads(self.advisor.to_json()), self.advisor.to_dict())
+        self.assertEqual(json.loads(self.itinerary.to_json()), self.itinerary.to_dict())
+        self.data_source.received_at = datetime(2025, 7, 1, 9, 30, 15, 123456, tzinfo=timezone.utc)
+        self.assertEqual(json.loads(self.data_source.to_json()), self.data_source.to_dict())
+        
+        # Test the standard library fallback produces the same document
+        with patch('travel_orm.models.orjson', None):
+            fallback = self.itinerary.to_json()
+        self.assertIsInstance(fallback, bytes)
+        self.assertEqual(json.loads(fallback), self.itinerary.to_dict())
 
 
 if __name__ == '__main__':
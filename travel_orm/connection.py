@@ -2,12 +2,14 @@
 Database connection management for TravelORM
 """
 
+import asyncio
+import functools
 import json
 import logging
 import os
-import boto3
+import threading
+import time
 from contextlib import contextmanager
-from botocore.exceptions import ClientError
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, scoped_session
 
@@ -15,17 +17,69 @@ from sqlalchemy.orm import sessionmaker, scoped_session
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Statements reused on every call are built once at import time
+_VERSION_QUERY = text("SELECT version()")
+
+# Decoded secrets keyed by secret ARN/name, stored as (fetched_at, credentials)
+_SECRET_CACHE = {}
+
+
+@functools.lru_cache(maxsize=1)
+def _sm_client():
+    """
+    Get the process-wide Secrets Manager client, creating it on first use
+    
+    Returns:
+        SecretsManager.Client: boto3 Secrets Manager client
+    """
+    from botocore.config import Config
+    
+    # Fail fast instead of sitting in botocore's default 60s timeouts and
+    # legacy retry loop while a cold start waits on credentials
+    config = Config(
+        connect_timeout=1,
+        read_timeout=3,
+        retries={'max_attempts': 2, 'mode': 'standard'}
+    )
+    return DatabaseConnection._get_aws_session().client('secretsmanager', config=config)
+
+
+def _scope_key():
+    """
+    Get the key that scoped sessions are registered under
+    
+    Code running inside an asyncio task gets a session per task, so coroutines
+    sharing an event loop thread do not share a session; other code gets one
+    session per thread.
+    
+    Returns:
+        Hashable: Current asyncio task, or the current thread id
+    """
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:  # No event loop running in this thread
+        task = None
+    return task if task is not None else threading.get_ident()
+
+
 class DatabaseConnection:
     """
     Singleton class for managing database connections
+    
+    The engine and session factory are created once per process; forked
+    child processes discard the connections inherited from their parent.
     """
     _instance = None
     _engine = None
     _session_factory = None
+    _aws_session = None
+    _init_lock = threading.Lock()
     
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(DatabaseConnection, cls).__new__(cls)
+            with cls._init_lock:
+                if cls._instance is None:
+                    cls._instance = super(DatabaseConnection, cls).__new__(cls)
         return cls._instance
     
     @classmethod
@@ -52,6 +106,21 @@ class DatabaseConnection:
             cls._initialize()
         return cls._session_factory
     
+    @classmethod
+    def _get_aws_session(cls):
+        """
+        Get the boto3 session shared by all AWS clients, creating it on first use
+        
+        Returns:
+            boto3.Session: boto3 session
+        """
+        if cls._aws_session is None:
+            # boto3 is only needed on this path; importing it lazily keeps
+            # `import travel_orm` cheap for callers that never touch AWS
+            import boto3
+            cls._aws_session = boto3.Session(region_name=os.environ.get('AWS_REGION'))
+        return cls._aws_session
+    
     @classmethod
     def _get_db_credentials(cls, secret_arn=None):
         """
@@ -78,18 +147,76 @@ class DatabaseConnection:
         
         if not secret_arn and not secret_name:
             raise ValueError("Either DB_SECRET_ARN or DB_SECRET_NAME environment variable must be set")
+        
+        secret_id = secret_arn or secret_name
+        return cls._get_secrets([secret_id])[secret_id]
+    
+    @classmethod
+    def _get_secrets(cls, secret_ids):
+        """
+        Get JSON secrets from AWS Secrets Manager in as few calls as possible
+        
+        Secrets fetched within the last DB_SECRET_TTL seconds are served from
+        the cache. A single miss uses GetSecretValue; several misses are
+        fetched together with BatchGetSecretValue.
+        
+        Args:
+            secret_ids (list): ARNs or names of the secrets to retrieve
             
-        client = boto3.client('secretsmanager')
+        Returns:
+            dict: Parsed secret values keyed by the requested ARN/name
+        """
+        ttl = float(os.environ.get('DB_SECRET_TTL', '300'))
+        now = time.monotonic()
+        secrets = {}
+        missing = []
+        for secret_id in secret_ids:
+            cached = _SECRET_CACHE.get(secret_id)
+            if cached is not None and now - cached[0] < ttl:
+                secrets[secret_id] = cached[1]
+            else:
+                missing.append(secret_id)
+        
+        if not missing:
+            return secrets
+        
+        from botocore.exceptions import ClientError
+        
+        client = _sm_client()
+        fetched = {}
         try:
-            if secret_arn:
-                response = client.get_secret_value(SecretId=secret_arn)
+            if len(missing) == 1:
+                response = client.get_secret_value(SecretId=missing[0])
+                fetched[missing[0]] = response['SecretString']
             else:
-                response = client.get_secret_value(SecretId=secret_name)
-                
-            return json.loads(response['SecretString'])
-        except ClientError as e:
-            logger.error(f"Error retrieving database credentials: {str(e)}")
+                # BatchGetSecretValue accepts at most 20 secret ids per call
+                for start in range(0, len(missing), 20):
+                    batch = missing[start:start + 20]
+                    response = client.batch_get_secret_value(SecretIdList=batch)
+                    if response.get('Errors'):
+                        failed = ', '.join(error['SecretId'] for error in response['Errors'])
+                        raise ValueError(f"Failed to retrieve secrets: {failed}")
+                    
+                    # Secrets can be requested by either ARN or name
+                    by_id = {}
+                    for value in response['SecretValues']:
+                        by_id[value['ARN']] = value['SecretString']
+                        by_id[value['Name']] = value['SecretString']
+                    # Partial ARNs are accepted but echoed back as full ARNs
+                    unmatched = [secret_id for secret_id in batch if secret_id not in by_id]
+                    if unmatched:
+                        raise ValueError(f"Failed to retrieve secrets: {', '.join(unmatched)}")
+                    for secret_id in batch:
+                        fetched[secret_id] = by_id[secret_id]
+        except (ClientError, ValueError) as e:
+            logger.error(f"Error retrieving secrets: {str(e)}")
             raise
+        
+        fetched_at = time.monotonic()
+        for secret_id, secret_string in fetched.items():
+            secrets[secret_id] = json.loads(secret_string)
+            _SECRET_CACHE[secret_id] = (fetched_at, secrets[secret_id])
+        return secrets
     
     @classmethod
     def _initialize(cls, secret_arn=None, db_name=None):
@@ -100,24 +227,72 @@ class DatabaseConnection:
             secret_arn (str): ARN of the secret containing database credentials
             db_name (str): Name of the database to connect to
         """
-        try:
-            # Get credentials from Secrets Manager
-            creds = cls._get_db_credentials(secret_arn)
-            db_name = db_name or os.environ.get('DB_NAME', 'travel_itinerary')
-            
-            # Create connection string using pg8000 instead of psycopg2
-            conn_string = f"postgresql+pg8000://{creds['username']}:{creds['password']}@{creds['host']}:{creds.get('port', 5432)}/{db_name}"
+        with cls._init_lock:
+            # Another caller may have finished initializing while we waited
+            if cls._engine is not None:
+                return
             
-            # Create engine
-            cls._engine = create_engine(conn_string)
-            
-            # Create session factory
-            cls._session_factory = scoped_session(sessionmaker(bind=cls._engine))
-            
-            logger.info("SQLAlchemy engine and session initialized successfully")
-        except Exception as e:
-            logger.error(f"Error initializing database connection: {str(e)}")
-            raise
+            try:
+                # Get credentials from Secrets Manager
+                creds = cls._get_db_credentials(secret_arn)
+                db_name = db_name or os.environ.get('DB_NAME', 'travel_itinerary')
+                
+                # Create connection string; psycopg2 is the declared dependency and
+                # decodes rows in C. Set DB_DRIVER=pg8000 where native extensions
+                # cannot be deployed
+                driver = os.environ.get('DB_DRIVER', 'psycopg2')
+                conn_string = f"postgresql+{driver}://{creds['username']}:{creds['password']}@{creds['host']}:{creds.get('port', 5432)}/{db_name}"
+                
+                connect_args = {}
+                if driver == 'psycopg':
+                    # psycopg 3 uses the binary protocol and server-side prepares
+                    # statements once they have run this many times on a connection
+                    connect_args['prepare_threshold'] = 5
+                
+                # Create engine with an explicitly sized pool; pre-ping and recycling
+                # keep idle RDS connections from surfacing as failed queries, and
+                # LIFO checkout lets surplus connections go idle and be recycled.
+                # Each process holds up to pool_size + max_overflow connections,
+                # so keep that times the worker count below max_connections
+                cls._engine = create_engine(
+                    conn_string,
+                    pool_size=int(os.environ.get('DB_POOL_SIZE', '20')),
+                    max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', '10')),
+                    pool_timeout=int(os.environ.get('DB_POOL_TIMEOUT', '30')),
+                    pool_recycle=int(os.environ.get('DB_POOL_RECYCLE', '1800')),
+                    pool_pre_ping=True,
+                    pool_use_lifo=True,
+                    echo_pool=os.environ.get('DB_ECHO_POOL', 'false').lower() == 'true',
+                    connect_args=connect_args
+                )
+                
+                # Create session factory; objects keep their loaded attributes after
+                # commit so they can be returned from a closed session
+                cls._session_factory = scoped_session(
+                    sessionmaker(bind=cls._engine, expire_on_commit=False),
+                    scopefunc=_scope_key
+                )
+                
+                logger.info("SQLAlchemy engine and session initialized successfully")
+            except Exception as e:
+                logger.error(f"Error initializing database connection: {str(e)}")
+                raise
+    
+    @classmethod
+    def _dispose_after_fork(cls):
+        """
+        Drop pooled connections and AWS clients inherited from a parent process
+        
+        The child must not reuse sockets the parent is still using, so the pool
+        is replaced without closing the parent's connections and AWS clients
+        are rebuilt on next use. The init lock is replaced too, since another
+        thread in the parent may have held it at the time of the fork.
+        """
+        cls._init_lock = threading.Lock()
+        cls._aws_session = None
+        _sm_client.cache_clear()
+        if cls._engine is not None:
+            cls._engine.dispose(close=False)
     
     @classmethod
     @contextmanager
@@ -125,10 +300,23 @@ class DatabaseConnection:
         """
         Provide a transactional scope around a series of operations.
         
+        A scope opened inside another scope on the same thread reuses the
+        outer session and runs in a SAVEPOINT; the outermost scope owns the
+        commit and the connection checkout, and removes the session from the
+        registry when it ends.
+        
         Yields:
             Session: SQLAlchemy session
         """
-        session = cls.get_session_factory()()
+        session_factory = cls.get_session_factory()
+        session = session_factory()
+        if session.info.get('in_scope'):
+            # Roll back only this block on error, then let the error propagate
+            with session.begin_nested():
+                yield session
+            return
+        
+        session.info['in_scope'] = True
         try:
             yield session
             session.commit()
@@ -137,7 +325,14 @@ class DatabaseConnection:
             logger.error(f"Error in database transaction: {str(e)}")
             raise
         finally:
-            session.close()
+            session.info.pop('in_scope', None)
+            # Close the session and drop it from the registry so the next scope
+            # starts with a fresh one
+            session_factory.remove()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=DatabaseConnection._dispose_after_fork)
 
 
 def test_connection():
@@ -149,7 +344,7 @@ def test_connection():
     """
     try:
         with DatabaseConnection.session_scope() as session:
-            result = session.execute(text("SELECT version()")).fetchone()
+            result = session.execute(_VERSION_QUERY).fetchone()
         return f"Successfully connected to PostgreSQL via SQLAlchemy. Version: {result[0]}"
     except Exception as e:
         return f"Failed to connect to database via SQLAlchemy: {str(e)}"
@@ -2,15 +2,21 @@
 SQLAlchemy models for the Travel Itinerary database
 """
 
+import json
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Date, Integer, ForeignKey, Text, ARRAY, text
+from sqlalchemy import Column, String, DateTime, Date, Integer, ForeignKey, Text, ARRAY, text, delete, func, insert, inspect, select, update
 from sqlalchemy.dialects.postgresql import UUID, ENUM
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import MANYTOMANY, ONETOMANY, relationship, selectinload
 
 from .connection import DatabaseConnection
 
+try:
+    import orjson
+except ImportError:  # orjson is an optional speedup; fall back to the stdlib
+    orjson = None
+
 # Create the base model class
 Base = declarative_base()
 
@@ -20,11 +26,43 @@ item_type_enum = ENUM('info', 'food', 'hotel', 'activity', 'transport',
 data_source_type_enum = ENUM('email', 'file', 'api', 'manual', 
                              name='data_source_type', create_type=False)
 
+def _to_str(value):
+    """Serialize a UUID (or other value) as a string, keeping None"""
+    return str(value) if value is not None else None
+
+
+def _to_isoformat(value):
+    """Serialize a date or datetime as an ISO 8601 string, keeping None"""
+    return value.isoformat() if value is not None else None
+
+
+def _passthrough(value):
+    """Return values that are already JSON-friendly unchanged"""
+    return value
+
+
+def _detach_loaded(session, instances, known):
+    """
+    Detach instances loaded by the current call so they stay usable after the
+    session is closed
+    
+    Instances in `known` were already in the session, e.g. loaded by an
+    enclosing scope; they stay attached so the caller's changes still flush.
+    """
+    for instance in instances:
+        if instance not in known and instance in session:
+            session.expunge(instance)
+
+
 # Base model class
 class Model:
     """
     Base model class with CRUD operations
     """
+    # Read SQL-side values such as updated_at's now() back with RETURNING on
+    # flush, so they are loaded before the instance leaves its session
+    __mapper_args__ = {'eager_defaults': True}
+    
     @classmethod
     def create(cls, **kwargs):
         """
@@ -40,15 +78,53 @@ class Model:
             instance = cls(**kwargs)
             session.add(instance)
             session.flush()  # Flush to get the ID
+            # Read the row back so the instance holds the values as stored, e.g.
+            # timezone-aware timestamps and coerced caller input
             session.refresh(instance)
-            # Create a copy of the instance to return after the session is closed
-            instance_copy = cls(**{
-                k: getattr(instance, k) 
-                for k in kwargs.keys() if hasattr(instance, k)
-            })
-            # Copy the ID
-            setattr(instance_copy, 'id', getattr(instance, 'id'))
-            return instance_copy
+            # Detach the loaded instance so it stays usable after the session is closed
+            session.expunge(instance)
+            return instance
+    
+    @classmethod
+    def create_many(cls, rows):
+        """
+        Create several records in a single transaction
+        
+        Args:
+            rows (list): Dicts of model attributes, one per record
+            
+        Returns:
+            list: Created records
+        """
+        with DatabaseConnection.session_scope() as session:
+            instances = [cls(**row) for row in rows]
+            session.add_all(instances)
+            session.flush()  # One flush batches the INSERTs for all rows
+            
+            # Detach the instances so they stay usable after the session is closed
+            for instance in instances:
+                session.expunge(instance)
+            return instances
+    
+    @classmethod
+    def bulk_create(cls, rows):
+        """
+        Insert several records without building model instances
+        
+        All rows are sent as one batched INSERT ... RETURNING; column defaults
+        still apply. Every row must provide the same set of keys.
+        
+        Args:
+            rows (list): Dicts of model attributes, one per record
+            
+        Returns:
+            list: IDs of the inserted records, in the order of rows
+        """
+        if not rows:
+            return []
+        with DatabaseConnection.session_scope() as session:
+            stmt = insert(cls).returning(cls.id, sort_by_parameter_order=True)
+            return list(session.scalars(stmt, rows))
     
     @classmethod
     def get_by_id(cls, id):
@@ -62,42 +138,86 @@ class Model:
             Model: Record or None if not found
         """
         with DatabaseConnection.session_scope() as session:
-            instance = session.query(cls).get(id)
+            known = set(session.identity_map.values())
+            instance = session.get(cls, id)
             if instance:
-                # Create a copy of the instance to return after the session is closed
-                instance_copy = cls()
-                for column in instance.__table__.columns:
-                    setattr(instance_copy, column.name, getattr(instance, column.name))
-                return instance_copy
-            return None
+                _detach_loaded(session, [instance], known)
+            return instance
     
     @classmethod
-    def list_all(cls, limit=None):
+    def list_all(cls, limit=None, eager=False):
         """
         List all records
         
         Args:
             limit (int, optional): Maximum number of records to return
+            eager (bool): Also load every direct relationship, using one extra
+                SELECT ... IN query per relationship instead of one per record
             
         Returns:
             list: List of records
         """
         with DatabaseConnection.session_scope() as session:
+            known = set(session.identity_map.values())
             query = session.query(cls)
+            if eager:
+                query = query.options(*(
+                    selectinload(getattr(cls, prop.key))
+                    for prop in inspect(cls).relationships
+                ))
             if limit is not None:
                 query = query.limit(limit)
             
             results = query.all()
+            _detach_loaded(session, results, known)
+            return results
+    
+    @classmethod
+    def list_rows(cls, limit=None):
+        """
+        List all records as read-only rows
+        
+        Rows are named tuples of the column values; they skip building ORM
+        instances and are much smaller, which suits large read-only results.
+        
+        Args:
+            limit (int, optional): Maximum number of records to return
             
-            # Create copies of the instances to return after the session is closed
-            copies = []
-            for instance in results:
-                instance_copy = cls()
-                for column in instance.__table__.columns:
-                    setattr(instance_copy, column.name, getattr(instance, column.name))
-                copies.append(instance_copy)
-                
-            return copies
+        Returns:
+            list: Rows with one attribute per column
+        """
+        with DatabaseConnection.session_scope() as session:
+            stmt = select(*cls.__table__.columns)
+            if limit is not None:
+                stmt = stmt.limit(limit)
+            return session.execute(stmt).all()
+    
+    @classmethod
+    def stream_all(cls, chunk=1000):
+        """
+        Iterate over all records without loading them into memory at once
+        
+        Rows are fetched from the database in batches of `chunk` on a dedicated
+        session that stays open until the iterator is exhausted or closed. It
+        is not shared with session_scope, so model calls made while iterating
+        run and commit in their own transactions.
+        
+        Args:
+            chunk (int): Number of rows fetched per batch
+            
+        Yields:
+            Model: Records, one at a time
+        """
+        # Build a session outside the scoped registry
+        session = DatabaseConnection.get_session_factory().session_factory()
+        try:
+            stmt = select(cls).execution_options(yield_per=chunk)
+            for instance in session.scalars(stmt):
+                # Detach the instance so it stays usable after the session is closed
+                session.expunge(instance)
+                yield instance
+        finally:
+            session.close()
     
     def update(self, **kwargs):
         """
@@ -109,22 +229,22 @@ class Model:
         Returns:
             Model: Updated record
         """
+        cls = self.__class__
         with DatabaseConnection.session_scope() as session:
-            # Get a fresh instance from the database
-            instance = session.query(self.__class__).get(self.id)
-            if not instance:
+            # Apply the changes and read back the whole row in one UPDATE ... RETURNING
+            stmt = (
+                update(cls)
+                .where(cls.id == self.id)
+                .values(**kwargs)
+                .returning(*cls.__table__.columns)
+            )
+            row = session.execute(stmt).mappings().first()
+            if row is None:
                 raise ValueError(f"Instance with id {self.id} not found")
-                
-            # Update attributes
-            for key, value in kwargs.items():
-                setattr(instance, key, value)
-                
-            # Also update the current instance
-            for key, value in kwargs.items():
-                setattr(self, key, value)
-                
-            session.flush()
-            session.refresh(instance)
+            
+            # Refresh the current instance, including onupdate columns
+            for name, value in row.items():
+                setattr(self, name, value)
             return self
     
     def delete(self):
@@ -137,13 +257,86 @@ class Model:
         Returns:
             bool: True if deleted
         """
+        cls = self.__class__
         with DatabaseConnection.session_scope() as session:
-            # Get a fresh instance from the database
-            instance = session.query(self.__class__).get(self.id)
-            if instance:
-                session.delete(instance)
-                return True
-            return False
+            if any(
+                prop.cascade.delete
+                or (prop.direction in (ONETOMANY, MANYTOMANY) and not prop.passive_deletes)
+                for prop in inspect(cls).relationships
+            ):
+                # The ORM deletes cascaded children and nulls out references from
+                # other rows before the DELETE, which needs the loaded row
+                instance = session.get(cls, self.id)
+                if instance:
+                    session.delete(instance)
+                    return True
+                return False
+            
+            # Delete and learn whether the row existed in one DELETE ... RETURNING
+            stmt = delete(cls).where(cls.id == self.id).returning(cls.id)
+            return session.execute(stmt).first() is not None
+    
+    @classmethod
+    def _get_dict_columns(cls):
+        """
+        Get the (column name, encoder) pairs used by to_dict
+        
+        Built once per model class so to_dict does no type dispatch per call.
+        
+        Returns:
+            tuple: (column name, encoder) pairs in table column order
+        """
+        dict_columns = cls.__dict__.get('_dict_columns')
+        if dict_columns is None:
+            pairs = []
+            for column in cls.__table__.columns:
+                if isinstance(column.type, UUID):
+                    encoder = _to_str
+                elif isinstance(column.type, (Date, DateTime)):
+                    encoder = _to_isoformat
+                else:
+                    encoder = _passthrough
+                pairs.append((column.name, encoder))
+            dict_columns = cls._dict_columns = tuple(pairs)
+        return dict_columns
+    
+    def to_dict(self):
+        """Convert model to dictionary"""
+        return {name: encode(getattr(self, name)) for name, encode in self._get_dict_columns()}
+    
+    def to_json(self):
+        """
+        Convert model to a compact JSON document
+        
+        Uses orjson when it is installed and the standard library otherwise;
+        both produce the same output.
+        
+        Returns:
+            bytes: UTF-8 encoded JSON
+        """
+        if orjson is not None:
+            # orjson encodes UUIDs, dates and datetimes natively, so the raw
+            # column values skip the per-field encoders used by to_dict
+            return orjson.dumps({name: getattr(self, name) for name, _ in self._get_dict_columns()})
+        data = self.to_dict()
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    
+    @classmethod
+    def delete_many(cls, ids):
+        """
+        Delete several records by ID in a single statement
+        
+        Args:
+            ids (list): Primary key values of the records to delete
+            
+        Returns:
+            int: Number of records deleted
+        """
+        if not ids:
+            return 0
+        with DatabaseConnection.session_scope() as session:
+            result = session.execute(delete(cls).where(cls.id.in_(ids)))
+            return result.rowcount
     
     @classmethod
     def execute_query(cls, query_func):
@@ -157,17 +350,13 @@ class Model:
             Any: Query result
         """
         with DatabaseConnection.session_scope() as session:
+            known = set(session.identity_map.values())
             result = query_func(session)
             
-            # If the result is a list of model instances, create copies
+            # If the result is a list of model instances, detach the ones this
+            # query loaded
             if isinstance(result, list) and len(result) > 0 and hasattr(result[0], '__table__'):
-                copies = []
-                for instance in result:
-                    instance_copy = instance.__class__()
-                    for column in instance.__table__.columns:
-                        setattr(instance_copy, column.name, getattr(instance, column.name))
-                    copies.append(instance_copy)
-                return copies
+                _detach_loaded(session, result, known)
             
             return result
 
@@ -176,49 +365,38 @@ class TravelAdvisor(Base, Model):
     """SQLAlchemy model for travel_advisors table"""
     __tablename__ = 'travel_advisors'
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    # In every model, the id and timestamp columns keep their Python defaults for
+    # rows created through the ORM and declare server defaults for rows inserted
+    # directly in SQL; gen_random_uuid() needs PostgreSQL 13+ or pgcrypto
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, server_default=text("gen_random_uuid()"))
     name = Column(String(255), nullable=False)
     phone_number = Column(String(50))
     website = Column(String(255))
     profile_image = Column(String(255))
     company_name = Column(String(255))
     company_logo = Column(String(255))
-    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
-    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now(), onupdate=func.now())
     
     # Relationships
     itineraries = relationship("Itinerary", back_populates="travel_advisor")
     
     def __repr__(self):
         return f"<TravelAdvisor(id='{self.id}', name='{self.name}', company='{self.company_name}')>"
-    
-    def to_dict(self):
-        """Convert model to dictionary"""
-        return {
-            'id': str(self.id),
-            'name': self.name,
-            'phone_number': self.phone_number,
-            'website': self.website,
-            'profile_image': self.profile_image,
-            'company_name': self.company_name,
-            'company_logo': self.company_logo,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
 
 
 class Itinerary(Base, Model):
     """SQLAlchemy model for itineraries table"""
     __tablename__ = 'itineraries'
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, server_default=text("gen_random_uuid()"))
     travel_advisor_id = Column(UUID(as_uuid=True), ForeignKey('travel_advisors.id'), nullable=False)
     start_date = Column(Date, nullable=False)
     duration = Column(Integer, nullable=False)
     destination = Column(String(255), nullable=False)
     cover_image = Column(String(255))
-    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
-    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now(), onupdate=func.now())
     
     # Relationships
     travel_advisor = relationship("TravelAdvisor", back_populates="itineraries", foreign_keys=[travel_advisor_id])
@@ -227,32 +405,19 @@ class Itinerary(Base, Model):
     
     def __repr__(self):
         return f"<Itinerary(id='{self.id}', destination='{self.destination}', start_date='{self.start_date}')>"
-    
-    def to_dict(self):
-        """Convert model to dictionary"""
-        return {
-            'id': str(self.id),
-            'travel_advisor_id': str(self.travel_advisor_id),
-            'start_date': self.start_date.isoformat() if self.start_date else None,
-            'duration': self.duration,
-            'destination': self.destination,
-            'cover_image': self.cover_image,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
 
 
 class DataSource(Base, Model):
     """SQLAlchemy model for data_source table"""
     __tablename__ = 'data_source'
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, server_default=text("gen_random_uuid()"))
     received_at = Column(DateTime(timezone=True), default=datetime.utcnow)
     processed_at = Column(DateTime(timezone=True), default=datetime.utcnow)
     type = Column(data_source_type_enum, nullable=False)
     url = Column(Text, nullable=False)
-    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
-    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now(), onupdate=func.now())
     
     # Relationships
     information_documents = relationship("InformationDocument", back_populates="data_source")
@@ -260,25 +425,13 @@ class DataSource(Base, Model):
     
     def __repr__(self):
         return f"<DataSource(id='{self.id}', type='{self.type}')>"
-    
-    def to_dict(self):
-        """Convert model to dictionary"""
-        return {
-            'id': str(self.id),
-            'received_at': self.received_at.isoformat() if self.received_at else None,
-            'processed_at': self.processed_at.isoformat() if self.processed_at else None,
-            'type': self.type,
-            'url': self.url,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
 
 
 class InformationDocument(Base, Model):
     """SQLAlchemy model for information_documents table"""
     __tablename__ = 'information_documents'
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, server_default=text("gen_random_uuid()"))
     itinerary_id = Column(UUID(as_uuid=True), ForeignKey('itineraries.id'), nullable=False)
     data_source_id = Column(UUID(as_uuid=True), ForeignKey('data_source.id'))
     index = Column(Integer, nullable=False)
@@ -286,8 +439,8 @@ class InformationDocument(Base, Model):
     text = Column(Text)
     formatted_text = Column(Text)
     photos = Column(ARRAY(String))
-    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
-    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now(), onupdate=func.now())
     
     # Relationships
     itinerary = relationship("Itinerary", back_populates="information_documents")
@@ -295,33 +448,18 @@ class InformationDocument(Base, Model):
     
     def __repr__(self):
         return f"<InformationDocument(id='{self.id}', title='{self.title}')>"
-    
-    def to_dict(self):
-        """Convert model to dictionary"""
-        return {
-            'id': str(self.id),
-            'itinerary_id': str(self.itinerary_id),
-            'data_source_id': str(self.data_source_id) if self.data_source_id else None,
-            'index': self.index,
-            'title': self.title,
-            'text': self.text,
-            'formatted_text': self.formatted_text,
-            'photos': self.photos,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
 
 
 class Day(Base, Model):
     """SQLAlchemy model for days table"""
     __tablename__ = 'days'
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, server_default=text("gen_random_uuid()"))
     itinerary_id = Column(UUID(as_uuid=True), ForeignKey('itineraries.id'), nullable=False)
     index = Column(Integer, nullable=False)
     title = Column(String(255), nullable=False)
-    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
-    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now(), onupdate=func.now())
     
     # Relationships
     itinerary = relationship("Itinerary", back_populates="days")
@@ -329,24 +467,13 @@ class Day(Base, Model):
     
     def __repr__(self):
         return f"<Day(id='{self.id}', itinerary_id='{self.itinerary_id}', index={self.index})>"
-    
-    def to_dict(self):
-        """Convert model to dictionary"""
-        return {
-            'id': str(self.id),
-            'itinerary_id': str(self.itinerary_id),
-            'index': self.index,
-            'title': self.title,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
 
 
 class ItineraryItem(Base, Model):
     """SQLAlchemy model for itinerary_items table"""
     __tablename__ = 'itinerary_items'
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, server_default=text("gen_random_uuid()"))
     day_id = Column(UUID(as_uuid=True), ForeignKey('days.id'), nullable=False)
     data_source_id = Column(UUID(as_uuid=True), ForeignKey('data_source.id'))
     index = Column(Integer, nullable=False)
@@ -354,8 +481,8 @@ class ItineraryItem(Base, Model):
     type = Column(item_type_enum, nullable=False)
     detail_text = Column(Text)
     photos = Column(ARRAY(String))
-    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
-    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now(), onupdate=func.now())
     
     # Relationships
     day = relationship("Day", back_populates="itinerary_items")
@@ -363,18 +490,3 @@ class ItineraryItem(Base, Model):
     
     def __repr__(self):
         return f"<ItineraryItem(id='{self.id}', day_id='{self.day_id}', type='{self.type}', title='{self.title}')>"
-    
-    def to_dict(self):
-        """Convert model to dictionary"""
-        return {
-            'id': str(self.id),
-            'day_id': str(self.day_id),
-            'data_source_id': str(self.data_source_id) if self.data_source_id else None,
-            'index': self.index,
-            'title': self.title,
-            'type': self.type,
-            'detail_text': self.detail_text,
-            'photos': self.photos,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }